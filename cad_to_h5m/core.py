@@ -1,9 +1,15 @@
 import sys
 import os
 import json
+from collections import defaultdict
 from typing import Dict, List, TypedDict, Optional
 from pathlib import Path
 
+# cubit is imported and initialised once per Python process. Later calls reuse
+# the session and reset the workspace at the start of each cad_to_h5m call
+_CUBIT = None
+_CUBIT_PATH = None
+
 
 class FilesWithTags(TypedDict, total=False):
     filename: str
@@ -50,6 +56,8 @@ def cad_to_h5m(
         simulations.
     cubit_path: the path to the Cubit directory used to import Cubit from. On
         Ubuntu with Cubit 2021.5 this would be "/opt/Coreform-Cubit-2021.5/bin/"
+        Cubit is only imported once per Python session, so later calls must
+        use the same cubit_path or a ValueError is raised.
     merge_tolerance: The merge tolerance to apply when merging surfaces into
         one.
     faceting_tolerance: The faceting tolerance to apply when faceting edges. Use
@@ -95,18 +103,19 @@ def cad_to_h5m(
             ' with either')
         raise ValueError(msg)
 
-    sys.path.append(cubit_path)
-
-    try:
-        import cubit
-    except ImportError:
-        msg = (
-            "import cubit failed, cubit was not importable from the "
-            f"provided path {cubit_path}"
-        )
-        raise ImportError(msg)
+    for entry in files_with_tags:
+        if "material_tag" not in entry.keys():
+            msg = f"dictionary key material_tag is missing for {entry}"
+            raise ValueError(msg)
+        if len(entry['material_tag']) > 27:
+            msg = ("material_tag > 28 characters. Material tags "
+                   "must be less than 28 characters use in DAGMC. "
+                   f"{entry['material_tag']} is too long.")
+            raise ValueError(msg)
 
-    cubit.init([])
+    cubit = _get_cubit(cubit_path)
+    # resets cubit workspace
+    cubit.cmd('reset')
     if not verbose:
         cubit.cmd('set echo off')
         cubit.cmd('set info off')
@@ -116,10 +125,14 @@ def cad_to_h5m(
     geometry_details, total_number_of_volumes = find_number_of_volumes_in_each_step_file(
         files_with_tags, cubit, verbose)
 
-    scale_geometry(geometry_details, cubit)
+    # joined volume ids of each entry, reused by each command on the entry
+    volume_strings = [_ids(entry["volumes"]) for entry in geometry_details]
+
+    scale_geometry(geometry_details, cubit, volume_strings)
 
     tag_geometry_with_mats(
-        geometry_details, implicit_complement_material_tag, cubit
+        geometry_details, implicit_complement_material_tag, cubit,
+        volume_strings
     )
 
     if imprint and total_number_of_volumes > 1:
@@ -129,7 +142,8 @@ def cad_to_h5m(
 
     # TODO method requires further testing
     find_reflecting_surfaces_of_reflecting_wedge(
-        geometry_details, surface_reflectivity_name, cubit, verbose
+        geometry_details, surface_reflectivity_name, cubit, verbose,
+        volume_strings
     )
 
     save_output_files(
@@ -144,12 +158,53 @@ def cad_to_h5m(
         verbose,
     )
 
-    # resets cubit workspace
-    cubit.cmd('reset')
-
     return h5m_filename
 
 
+def _get_cubit(cubit_path: str):
+    """Imports and initialises cubit from the cubit_path on the first call and
+    returns the same initialised module on later calls. Python caches the
+    imported module, so a different cubit_path can not be used once cubit has
+    been initialised."""
+
+    global _CUBIT, _CUBIT_PATH
+
+    # trailing slashes and symlinks do not make a different cubit_path
+    real_cubit_path = os.path.realpath(cubit_path)
+
+    if _CUBIT is not None:
+        if real_cubit_path != _CUBIT_PATH:
+            msg = (
+                f"cubit has already been imported from {_CUBIT_PATH} in this "
+                f"Python session and can not be reimported from {cubit_path}"
+            )
+            raise ValueError(msg)
+        return _CUBIT
+
+    if real_cubit_path not in map(os.path.realpath, sys.path):
+        sys.path.insert(0, cubit_path)
+
+    try:
+        import cubit
+    except ImportError:
+        msg = (
+            "import cubit failed, cubit was not importable from the "
+            f"provided path {cubit_path}"
+        )
+        raise ImportError(msg)
+
+    cubit.init([])
+    _CUBIT = cubit
+    _CUBIT_PATH = real_cubit_path
+
+    return _CUBIT
+
+
+def _ids(ids) -> str:
+    """Joins ids into the space separated list used in cubit commands"""
+    return " ".join(map(str, ids))
+
+
 def create_tet_mesh(geometry_details, cubit):
     cubit.cmd("Trimesher volume gradation 1.3")
 
@@ -166,11 +221,20 @@ def create_tet_mesh(geometry_details, cubit):
                 cubit.cmd("mesh volume " + str(volume))
 
 
-def scale_geometry(geometry_details: dict, cubit):
-    for entry in geometry_details:
+def scale_geometry(
+    geometry_details: dict,
+    cubit,
+    volume_strings: Optional[List[str]] = None
+):
+    # entries sharing a scale factor are scaled with a single command
+    if volume_strings is None:
+        volume_strings = [_ids(entry["volumes"]) for entry in geometry_details]
+    volumes_by_scale = defaultdict(list)
+    for entry, volume_string in zip(geometry_details, volume_strings):
         if 'scale' in entry.keys():
-            cubit.cmd(
-                f'volume {" ".join(entry["volumes"])}  scale  {entry["scale"]}')
+            volumes_by_scale[entry["scale"]].append(volume_string)
+    for scale, volumes in volumes_by_scale.items():
+        cubit.cmd(f'volume {" ".join(volumes)}  scale  {scale}')
 
 # TODO implent a flag to allow tet file info to be saved
 # def save_tet_details_to_json_file(
@@ -199,39 +263,34 @@ def save_output_files(
     verbose: bool
 ):
     """This saves the output files"""
+    os.makedirs(os.path.dirname(os.fspath(h5m_filename)) or ".", exist_ok=True)
+    if exo_filename is not None:
+        os.makedirs(
+            os.path.dirname(os.fspath(exo_filename)) or ".", exist_ok=True)
+
     cubit.cmd("set attribute on")
     # use a faceting_tolerance 1.0e-4 or smaller for accurate simulations
     if geometry_details_filename is not None:
         with open(geometry_details_filename, "w") as outfile:
             json.dump(geometry_details, outfile, indent=4)
 
-    Path(h5m_filename).parents[0].mkdir(parents=True, exist_ok=True)
+    # an absolute path saves DAGMC resolving it relative to Cubit's cwd
+    h5m_path = os.path.abspath(h5m_filename)
     if verbose:
         print("using faceting_tolerance of ", faceting_tolerance)
-    if make_watertight:
-        cubit.cmd(
-            'export dagmc "'
-            + h5m_filename
-            + '" faceting_tolerance '
-            + str(faceting_tolerance)
-            + " make_watertight"
-        )
-    else:
-        cubit.cmd(
-            'export dagmc "'
-            + h5m_filename
-            + '" faceting_tolerance '
-            + str(faceting_tolerance)
-        )
+    watertight = " make_watertight" if make_watertight else ""
+    cubit.cmd(
+        f'export dagmc "{h5m_path}" '
+        f'faceting_tolerance {faceting_tolerance}{watertight}'
+    )
 
     create_tet_mesh(geometry_details, cubit)
 
     if exo_filename is not None:
-        Path(exo_filename).parents[0].mkdir(parents=True, exist_ok=True)
         cubit.cmd(f'export mesh "{exo_filename}" overwrite')
 
     if cubit_filename is not None:
-        cubit.cmd('save as "' + cubit_filename + '" overwrite')
+        cubit.cmd(f'save as "{cubit_filename}" overwrite')
 
     return h5m_filename
 
@@ -252,18 +311,17 @@ def merge_geometry(merge_tolerance: float, cubit):
     cubit.cmd("merge vol all group_results")
 
 
-def find_all_surfaces_of_reflecting_wedge(new_vols, cubit, verbose: bool):
+def find_all_surfaces_of_reflecting_wedge(vol_str, cubit, verbose: bool):
     surfaces_in_volume = cubit.parse_cubit_list(
-        "surface", " in volume " + " ".join(new_vols)
+        "surface", f" in volume {vol_str}"
     )
     surface_info_dict = {}
     for surface_id in surfaces_in_volume:
         surface = cubit.surface(surface_id)
         # area = surface.area()
-        vertex_in_surface = cubit.parse_cubit_list(
-            "vertex", " in surface " + str(surface_id)
-        )
-        if surface.is_planar() and len(vertex_in_surface) == 4:
+        # vertices are only counted for planar surfaces and are read from the
+        # surface object rather than a parsed "in surface" query
+        if surface.is_planar() and len(surface.vertices()) == 4:
             surface_info_dict[surface_id] = {"reflector": True}
         else:
             surface_info_dict[surface_id] = {"reflector": False}
@@ -273,84 +331,81 @@ def find_all_surfaces_of_reflecting_wedge(new_vols, cubit, verbose: bool):
 
 
 def find_reflecting_surfaces_of_reflecting_wedge(
-    geometry_details, surface_reflectivity_name, cubit, verbose
+    geometry_details, surface_reflectivity_name, cubit, verbose,
+    volume_strings: Optional[List[str]] = None
 ):
     if verbose:
         print("running find_reflecting_surfaces_of_reflecting_wedge")
+    if volume_strings is None:
+        volume_strings = [_ids(entry["volumes"]) for entry in geometry_details]
     wedge_volume = None
-    for entry in geometry_details:
+    for entry, volume_string in zip(geometry_details, volume_strings):
         if verbose:
             print(entry)
             print(entry.keys())
         if "surface_reflectivity" in entry.keys():
             surface_info_dict = entry["surface_reflectivity"]
-            wedge_volume = " ".join(entry["volumes"])
+            wedge_volume = volume_string
             surfaces_in_wedge_volume = cubit.parse_cubit_list(
-                "surface", " in volume " + str(wedge_volume)
+                "surface", f" in volume {wedge_volume}"
             )
             if verbose:
                 print("found surface_reflectivity")
                 print("wedge_volume", wedge_volume)
                 print("surfaces_in_wedge_volume", surfaces_in_wedge_volume)
-            for surface_id in surface_info_dict.keys():
+            surfaces_in_wedge_volume_set = set(surfaces_in_wedge_volume)
+            # keys are copied as entries are deleted while looping
+            for surface_id in list(surface_info_dict.keys()):
                 if surface_info_dict[surface_id]["reflector"]:
                     if verbose:
                         print(
                             surface_id,
                             "surface originally reflecting but does it still exist",
                         )
-                    if surface_id not in surfaces_in_wedge_volume:
+                    if surface_id not in surfaces_in_wedge_volume_set:
                         del surface_info_dict[surface_id]
             for surface_id in surfaces_in_wedge_volume:
-                if surface_id not in surface_info_dict.keys():
+                if surface_id not in surface_info_dict:
                     surface_info_dict[surface_id] = {"reflector": True}
                     cubit.cmd(
-                        'group "'
-                        + surface_reflectivity_name
-                        + '" add surf '
-                        + str(surface_id)
+                        f'group "{surface_reflectivity_name}" '
+                        f'add surf {surface_id}'
                     )
-                    cubit.cmd("surface " + str(surface_id) + " visibility on")
+                    cubit.cmd(f"surface {surface_id} visibility on")
             entry["surface_reflectivity"] = surface_info_dict
             return geometry_details, wedge_volume
     return geometry_details, wedge_volume
 
 
 def tag_geometry_with_mats(
-    geometry_details, implicit_complement_material_tag, cubit
+    geometry_details, implicit_complement_material_tag, cubit,
+    volume_strings: Optional[List[str]] = None
 ):
-    for entry in geometry_details:
-        if "material_tag" in entry.keys():
-
-            if len(entry['material_tag']) > 27:
-                msg = ("material_tag > 28 characters. Material tags "
-                       "must be less than 28 characters use in DAGMC. "
-                       f"{entry['material_tag']} is too long.")
-                raise ValueError(msg)
-
-            cubit.cmd(
-                'group "mat:'
-                + str(entry["material_tag"])
-                + '" add volume '
-                + " ".join(entry["volumes"])
-            )
-            if entry['material_tag'].lower() == 'graveyard':
-                if implicit_complement_material_tag is not None:
-                    graveyard_volume_number = entry["volumes"][0]
-                    cubit.cmd(
-                        f'group "mat:{implicit_complement_material_tag}_comp" add vol {graveyard_volume_number}'
-                    )
-        else:
-            msg = f"dictionary key material_tag is missing for {entry}"
-            raise ValueError(msg)
+    # volumes are gathered per material so each group is added to once
+    # material tags are checked by cad_to_h5m before any cubit commands run
+    if volume_strings is None:
+        volume_strings = [_ids(entry["volumes"]) for entry in geometry_details]
+    volumes_by_material = defaultdict(list)
+    for entry, volume_string in zip(geometry_details, volume_strings):
+        volumes_by_material[entry["material_tag"]].append(volume_string)
+        if entry['material_tag'].lower() == 'graveyard':
+            if implicit_complement_material_tag is not None:
+                graveyard_volume_number = entry["volumes"][0]
+                cubit.cmd(
+                    f'group "mat:{implicit_complement_material_tag}_comp" add vol {graveyard_volume_number}'
+                )
+
+    for material_tag, volumes in volumes_by_material.items():
+        cubit.cmd(
+            f'group "mat:{material_tag}" add volume {" ".join(volumes)}')
 
 
 def find_number_of_volumes_in_each_step_file(files_with_tags, cubit, verbose):
     """ """
+    total_number_of_volumes = 0
     for entry in files_with_tags:
         if verbose:
             print(f'loading {entry["cad_filename"]}')
-        current_vols = cubit.parse_cubit_list("volume", "all")
         if entry["cad_filename"].endswith(
                 ".stp") or entry["cad_filename"].endswith(".step"):
             import_type = "step"
@@ -364,36 +419,25 @@ def find_number_of_volumes_in_each_step_file(files_with_tags, cubit, verbose):
             msg = f'File with filename {entry["cad_filename"]} could not be found'
             raise FileNotFoundError(msg)
         short_file_name = os.path.split(entry["cad_filename"])[-1]
+        # cubit does not reuse ids so volumes from this file are above last_id
+        last_id = cubit.get_last_id("volume")
         cubit.cmd(
-            "import "
-            + import_type
-            + ' "'
-            + entry["cad_filename"]
-            + '" separate_bodies no_surfaces no_curves no_vertices '
+            f'import {import_type} "{entry["cad_filename"]}" '
+            'separate_bodies no_surfaces no_curves no_vertices '
         )
-        all_vols = cubit.parse_cubit_list("volume", "all")
-        new_vols = set(current_vols).symmetric_difference(set(all_vols))
-        new_vols = list(map(str, new_vols))
+        new_vols = find_volumes_created_after(last_id, cubit)
         if len(new_vols) > 1:
-            cubit.cmd(
-                "unite vol " +
-                " ".join(new_vols) +
-                " with vol " +
-                " ".join(new_vols))
-        all_vols = cubit.parse_cubit_list("volume", "all")
-        new_vols_after_unite = set(
-            current_vols).symmetric_difference(set(all_vols))
-        new_vols_after_unite = list(map(str, new_vols_after_unite))
+            cubit.cmd(f"unite vol {_ids(new_vols)}")
+            new_vols_after_unite = find_volumes_created_after(last_id, cubit)
+        else:
+            new_vols_after_unite = new_vols
+        total_number_of_volumes += len(new_vols_after_unite)
         entry["volumes"] = new_vols_after_unite
-        cubit.cmd(
-            'group "' +
-            short_file_name +
-            '" add volume ' +
-            " ".join(
-                entry["volumes"]))
+        vol_str = _ids(new_vols_after_unite)
+        cubit.cmd(f'group "{short_file_name}" add volume {vol_str}')
         if "surface_reflectivity" in entry.keys():
             entry["surface_reflectivity"] = find_all_surfaces_of_reflecting_wedge(
-                new_vols_after_unite, cubit)
+                vol_str, cubit, verbose)
             if verbose:
                 print(
                     "entry['surface_reflectivity']",
@@ -405,4 +449,15 @@ def find_number_of_volumes_in_each_step_file(files_with_tags, cubit, verbose):
     # commented out as cmd not known see issue #3
     # cubit.cmd("autoheal analyze vol all")
 
-    return files_with_tags, sum(all_vols)
+    return files_with_tags, total_number_of_volumes
+
+
+def find_volumes_created_after(last_id: int, cubit):
+    """Returns the ids, as strings, of the existing volumes with ids above
+    last_id. Only the new id range is queried rather than all volumes."""
+    newest_id = cubit.get_last_id("volume")
+    if newest_id <= last_id:
+        return []
+    new_vols = cubit.parse_cubit_list(
+        "volume", f"{last_id + 1} to {newest_id}")
+    return list(map(str, new_vols))
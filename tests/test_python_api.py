@@ -1,3 +1,4 @@
+import json
 import os
 import tarfile
 import unittest
@@ -233,6 +234,47 @@ class TestApiUsage(unittest.TestCase):
             )
         self.assertRaises(ValueError, incorrect_suffix)
 
+    def test_geometry_details_volumes_are_distinct(self):
+        """Checks that each volume in the geometry details belongs to only one
+        entry so the total volume count matches the distinct volume ids"""
+
+        os.system("rm geometry_details.json")
+
+        cad_to_h5m(
+            files_with_tags=[
+                {
+                    "cad_filename": "tests/fusion_example_for_openmc_using_paramak-0.0.1/stp_files/blanket.stp",
+                    "material_tag": "mat1",
+                },
+                {
+                    "cad_filename": "tests/fusion_example_for_openmc_using_paramak-0.0.1/stp_files/pf_coils.stp",
+                    "material_tag": "mat2",
+                }],
+            geometry_details_filename="geometry_details.json",
+        )
+
+        with open("geometry_details.json") as infile:
+            geometry_details = json.load(infile)
+
+        all_volumes = [
+            volume for entry in geometry_details for volume in entry["volumes"]]
+
+        assert len(all_volumes) > 1
+        assert len(all_volumes) == len(set(all_volumes))
+
+    def test_long_material_tag_error_handling(self):
+        """Attempts to use a material tag longer than DAGMC allows"""
+
+        def long_material_tag():
+            cad_to_h5m(
+                files_with_tags=[
+                    {
+                        "cad_filename": "tests/fusion_example_for_openmc_using_paramak-0.0.1/stp_files/pf_coils.stp",
+                        "material_tag": "a_material_tag_that_is_too_long",
+                    }],
+            )
+        self.assertRaises(ValueError, long_material_tag)
+
     def test_h5m_file_creation_with_scaling(self):
         """Checks that a h5m file is created from stp files when volumes are
         scaled """